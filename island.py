@@ -1,16 +1,22 @@
 import sys
 import time
 import os
+import tempfile
 import threading
-import requests
-import json
+import socket
 import asyncio
+import aiohttp
+import orjson
+import msgpack
 import websockets
-import ctypes
+import redis
+import filelock
 import logging
 from collections import deque
+from functools import lru_cache
+from typing import Final
 from PyQt5.QtWidgets import QApplication, QWidget, QLabel, QHBoxLayout, QMenu, QAction, QVBoxLayout, QInputDialog, QSystemTrayIcon
-from PyQt5.QtCore import Qt, QTimer, QPoint, QPropertyAnimation, QEasingCurve, QRect, pyqtSignal
+from PyQt5.QtCore import Qt, QTimer, QPoint, QPropertyAnimation, QEasingCurve, QRect, QRunnable, QThreadPool, pyqtSignal
 from PyQt5.QtGui import QColor, QFont, QIcon
 
 logging.basicConfig(
@@ -20,8 +26,94 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def _island_css(background, border):
+    return f"""
+    #IslandContainer {{
+        background-color: {background};
+        border: {border};
+        border-radius: 25px;
+    }}
+"""
+
+def _label_css(color):
+    return f"color: {color}; font-weight: bold;"
+
+def _mono_css(color, size="14pt"):
+    return f"color: {color}; font-family: 'Consolas'; font-size: {size}; font-weight: bold;"
+
+# 🎨 [样式常量] 模块加载时构建一次，避免每条消息重新拼接样式表
+STYLE_INITIAL: Final[str] = _island_css("rgb(15, 15, 20)", "1px solid rgba(255, 255, 255, 0.1)")
+STYLE_DARK: Final[str] = _island_css("rgba(15, 15, 20, 0.95)", "1px solid rgba(255, 255, 255, 0.2)")
+STYLE_ORANGE: Final[str] = _island_css("rgba(255, 136, 0, 0.95)", "1px solid rgba(255, 255, 255, 0.3)")
+STYLE_RED: Final[str] = _island_css("rgba(255, 68, 68, 0.95)", "1px solid rgba(255, 255, 255, 0.3)")
+STYLE_FUSED: Final[str] = _island_css("rgba(255, 77, 79, 0.95)", "2px solid rgba(255, 255, 255, 0.5)")
+STYLE_GREEN_NEW_CHAT: Final[str] = _island_css("rgba(82, 196, 26, 0.95)", "2px solid rgba(255, 255, 255, 0.5)")
+STYLE_GREEN_RESET: Final[str] = _island_css("rgba(76, 175, 80, 0.95)", "2px solid rgba(255, 255, 255, 0.5)")
+STYLE_BLUE_HISTORY: Final[str] = _island_css("rgba(33, 150, 243, 0.95)", "2px solid rgba(255, 255, 255, 0.5)")
+STYLE_YELLOW_WARN: Final[str] = _island_css("rgba(255, 165, 0, 0.95)", "2px solid rgba(255, 255, 255, 0.5)")
+STYLE_ERROR: Final[str] = _island_css("rgba(244, 67, 54, 0.95)", "2px solid rgba(255, 255, 255, 0.5)")
+STYLE_LIGHT: Final[str] = _island_css("rgba(255, 255, 255, 0.9)", "2px solid rgba(255, 255, 255, 0.5)")
+STYLE_GRADIENT: Final[str] = """
+    #IslandContainer {
+        background-color: qlineargradient(x1:0, y1:0, x2:1, y2:1,
+                            stop:0 rgba(20, 20, 25, 240),
+                            stop:1 rgba(10, 10, 15, 250));
+        border: 1px solid rgba(255,255, 255, 0.1);
+        border-radius: 25px;
+    }
+    QLabel {
+        background: transparent;
+    }
+"""
+
+LABEL_GREY_SMALL: Final[str] = "color: #888; font-weight: bold; font-size: 10pt;"
+LABEL_GREY_BOLD: Final[str] = _label_css("#888")
+LABEL_WHITE_BOLD: Final[str] = _label_css("#FFFFFF")
+LABEL_DARK_BOLD: Final[str] = _label_css("#333")
+LABEL_FUSED_BOLD: Final[str] = _label_css("#FF4D4F")
+LABEL_GREEN_NEW_CHAT: Final[str] = _label_css("#52C41A")
+LABEL_GREEN_RESET: Final[str] = _label_css("#4CAF50")
+LABEL_BLUE_HISTORY: Final[str] = _label_css("#2196F3")
+LABEL_YELLOW_WARN: Final[str] = _label_css("#FFA500")
+LABEL_ERROR: Final[str] = _label_css("#F44336")
+
+LABEL_GREEN_MONO: Final[str] = _mono_css("#00FF7F")
+LABEL_WHITE_MONO: Final[str] = _mono_css("#FFFFFF")
+LABEL_DARK_MONO: Final[str] = _mono_css("#333")
+LABEL_FUSED_MONO: Final[str] = _mono_css("#FF4D4F")
+LABEL_GREEN_NEW_CHAT_MONO: Final[str] = _mono_css("#52C41A")
+LABEL_GREEN_RESET_MONO: Final[str] = _mono_css("#4CAF50")
+LABEL_BLUE_HISTORY_MONO: Final[str] = _mono_css("#2196F3")
+LABEL_YELLOW_WARN_MONO: Final[str] = _mono_css("#FFA500")
+LABEL_ERROR_MONO: Final[str] = _mono_css("#F44336", "12pt")
+
+HISTORY_KEY_PREFIX: Final[str] = "sentinel:chat:"
+
+def _to_micro(cost):
+    # 金额量化为 int64 微单位（× 1e6），整条链路只做这一次浮点运算
+    return int(round(cost * 1_000_000))
+
+def _decode_frame(message):
+    # 二进制帧按 msgpack 解析；文本帧或以 '{' 开头的二进制帧按 JSON 回退
+    if isinstance(message, (bytes, bytearray)) and message[:1] != b"{":
+        return msgpack.unpackb(message, raw=False)
+    return orjson.loads(message)
+
+class _Task(QRunnable):
+    def __init__(self, fn):
+        super().__init__()
+        self.fn = fn
+
+    def run(self):
+        self.fn()
+
 class DynamicIsland(QWidget):
-    billing_signal = pyqtSignal(str, float)
+    # 金额以 int64 微单位（× 1e6）传递，仅在显示时转换
+    billing_signal = pyqtSignal(str, 'qlonglong')
+    billing_dict_signal = pyqtSignal(dict, 'qlonglong')
+    reset_signal = pyqtSignal(bool, str)
+    history_signal = pyqtSignal(list)
+    history_error_signal = pyqtSignal(str)
     
     def __init__(self):
         super().__init__()
@@ -31,15 +123,41 @@ class DynamicIsland(QWidget):
         self.is_busy = False
         self.currency = "CNY"  # 默认人民币
         self.currency_symbol = "￥"
+        self._last_theme = None  # 上一次应用的 (容器样式, 金额标签样式)
         self.initUI()
         self.initSystemTray()
+        self.initContextMenu()
         self.oldPos = self.pos()
         self.last_processed_id = None
-        self.billing_signal.connect(self.show_billing)
+        # 🧵 [线程亲和] 以下信号均由 WebSocket / 线程池线程发出，显式使用队列连接，
+        # 槽函数始终在 GUI 线程执行（即使将来在 GUI 线程中 emit 也不会变成同步调用）
+        self.billing_signal.connect(self.show_billing, Qt.QueuedConnection)
+        self.billing_dict_signal.connect(self.show_fused, Qt.QueuedConnection)
+        self.reset_signal.connect(self._on_reset_result, Qt.QueuedConnection)
+        self.history_signal.connect(self._on_history_loaded, Qt.QueuedConnection)
+        self.history_error_signal.connect(self._on_history_error, Qt.QueuedConnection)
+        # DB1：历史对话库（连接按需建立，SCAN 不阻塞 Redis 服务端）
+        self._redis = redis.Redis(host='127.0.0.1', port=6379, db=1, decode_responses=True, socket_connect_timeout=1)
         self.ws = None
         self.ws_thread = None
+        self._handlers = {"billing": self._on_billing, "error": self._on_error}  # WebSocket 消息分发表
+        self.loop = None  # WebSocket 线程中的事件循环，用于调度控制面请求
+        self._http = None  # 控制面 HTTP 连接池，在事件循环线程中创建
+        QApplication.instance().aboutToQuit.connect(self._close_http)
         self.is_shrunk = False  # 是否收缩到小圆点
         self.shrink_anim = None  # 收缩动画
+        
+        # 🚀 [合并刷新] 高频计费只保留最新一条，最多 ~30Hz 重绘一次
+        self._pending_billing = None
+        self._repaint_timer = QTimer(self)
+        self._repaint_timer.setSingleShot(True)
+        self._repaint_timer.setInterval(33)
+        self._repaint_timer.timeout.connect(self._flush_billing)
+        
+        # 📋 [队列] 常驻定时器按 ~30Hz 消费 billing_queue
+        self._queue_timer = QTimer(self)
+        self._queue_timer.setInterval(33)
+        self._queue_timer.timeout.connect(self._drain_queue)
 
     def initUI(self):
         self.setWindowFlags(Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint | Qt.Tool)
@@ -58,27 +176,40 @@ class DynamicIsland(QWidget):
         layout.setSpacing(10)
 
         self.label_model = QLabel("Sentinel")
-        self.label_model.setStyleSheet("color: #888; font-weight: bold; font-size: 10pt;")
+        self.label_model.setStyleSheet(LABEL_GREY_SMALL)
         
         self.label_cost = QLabel(f"{self.currency_symbol}0.0000")
-        self.label_cost.setStyleSheet("color: #00FF7F; font-family: 'Consolas'; font-size: 14pt; font-weight: bold;")
 
         layout.addWidget(self.label_model)
         layout.addStretch()
         layout.addWidget(self.label_cost)
 
-        self.container.setStyleSheet(""" 
-            #IslandContainer { 
-                background-color: rgb(15, 15, 20); 
-                border: 1px solid rgba(255, 255, 255, 0.1); 
-                border-radius: 25px; 
-            } 
-        """)
+        self._apply_theme(STYLE_INITIAL, LABEL_GREEN_MONO)
 
         main_layout = QVBoxLayout(self)
         main_layout.setContentsMargins(0, 0, 0, 0)
         main_layout.addWidget(self.container, 0, Qt.AlignCenter)
 
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _fmt_price(symbol, price_micro, precision):
+        # 以微单位整数为键缓存格式化结果，心跳推送的重复金额无需重新分配字符串
+        return f"{symbol}{price_micro / 1_000_000:.{precision}f}"
+
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _fmt_session_id(session_id):
+        return f"ID: {session_id[-8:]}"
+
+    def _apply_theme(self, container_css, label_css):
+        # 样式未变化时跳过，避免 Qt 重新解析样式表并刷新整棵控件树
+        theme = (container_css, label_css)
+        if theme == self._last_theme:
+            return
+        self._last_theme = theme
+        self.container.setStyleSheet(container_css)
+        self.label_cost.setStyleSheet(label_css)
+
     def initSystemTray(self):
         self.tray_icon = QSystemTrayIcon(self)
         self.tray_icon.setToolTip("Deep Sentinel - 哨兵")
@@ -107,57 +238,77 @@ class DynamicIsland(QWidget):
 
     async def connect_websocket(self):
         uri = "ws://127.0.0.1:3001/v1/ws"
-        logger.info(f"🔌 [WebSocket] 正在连接到 {uri}...")
         
-        try:
-            async with websockets.connect(uri) as websocket:
-                logger.info(f"✅ [WebSocket] 连接成功！")
-                self.ws = websocket
-                logger.info(f"🔍 [WebSocket] 开始监听消息...")
-                async for message in websocket:
-                    print(f"📨 [WebSocket] 收到原始消息: {message[:100]}...")
-                    try:
-                        data = json.loads(message)
-                        print(f"🔍 [WebSocket] 解析后的数据: {data}")
-                        
-                        # ✅ 统一处理逻辑：优先检查 type 字段
-                        if data.get("type") == "billing":
-                            model = data.get("model", "Unknown")
-                            cost = data.get("cost", 0.0)
-                            
-                            # 更新币种符号
-                            if "currency" in data:
-                                self.currency = data["currency"]
-                                self.currency_symbol = "$" if data["currency"] == "USD" else "￥"
-                                print(f"🌍 [WebSocket] 币种更新为: {self.currency} ({self.currency_symbol})")
+        # 🔄 [重连] 循环而非递归，重连次数再多也只占用一个协程帧
+        while True:
+            logger.info(f"🔌 [WebSocket] 正在连接到 {uri}...")
+            
+            try:
+                async with websockets.connect(uri, max_size=2**20, compression=None) as websocket:
+                    logger.info(f"✅ [WebSocket] 连接成功！")
+                    self.ws = websocket
+                    # 🚀 [低延迟] 关闭 Nagle 算法，小帧（ping / 回执）立即发送
+                    sock = websocket.transport.get_extra_info('socket')
+                    if sock is not None:
+                        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                    logger.debug("🔍 [WebSocket] 开始监听消息...")
+                    async for message in websocket:
+                        # 热路径：仅在 DEBUG 级别下才做切片 / dict 格式化
+                        debug = logger.isEnabledFor(logging.DEBUG)
+                        if debug:
+                            logger.debug("📨 [WebSocket] 收到原始消息: %s...", message[:100])
+                        try:
+                            data = _decode_frame(message)
+                            if data.get("type") == "billing":
+                                # 🚫 [快速过滤] 心跳 / 无效计费在此丢弃，不再跨线程投递到 UI（阈值与 show_billing 一致）
+                                if _to_micro(data.get("cost", 0.0)) <= 1 and not data.get("fused"):
+                                    continue
+                            if debug:
+                                logger.debug("🔍 [WebSocket] 解析后的数据: %s", data)
                             
-                            # 🆕 [铁血熔断] 检查是否是熔断信号
-                            if data.get("fused", False):
-                                print(f"🚨 [WebSocket] 收到熔断信号！准备传递给UI")
-                                self.billing_signal.emit(data, cost)
+                            # ✅ 统一处理逻辑：按 type 字段分发
+                            handler = self._handlers.get(data.get("type"))
+                            if handler:
+                                handler(data)
                             else:
-                                print(f"💰 [WebSocket] 收到计费: {model} = {self.currency_symbol}{cost:.6f}")
-                                print(f"🚀 [WebSocket] 准备触发 billing_signal.emit()")
-                                self.billing_signal.emit(model, cost)
-                                print(f"✅ [WebSocket] billing_signal.emit() 已完成")
-                        elif data.get("type") == "error":
-                            # 🆕 [熔断错误] 处理错误信号
-                            reason = data.get("reason", "unknown")
-                            if reason == "budget_exceeded":
-                                print(f"🚨 [WebSocket] 收到预算超支错误信号！")
-                                cost = data.get("cost", 0.0)
-                                self.show_billing({"fused": True, "reason": reason}, cost)
-                        else:
-                            print(f"⚠️ [WebSocket] 收到未知类型消息: {data.get('type', 'N/A')}")
-                    except Exception as e:
-                        print(f"❌ [WebSocket] 消息解析失败: {e}")
-                        import traceback
-                        traceback.print_exc()
-        except Exception as e:
-            print(f"❌ [WebSocket] 连接失败: {e}")
-            print(f"🔄 [WebSocket] 5秒后重连...")
+                                logger.debug("⚠️ [WebSocket] 收到未知类型消息: %s", data.get('type', 'N/A'))
+                        except Exception:
+                            logger.exception("❌ [WebSocket] 消息解析失败")
+            except Exception as e:
+                logger.warning(f"❌ [WebSocket] 连接失败: {e}")
+            else:
+                logger.info("🔌 [WebSocket] 连接已关闭")
+            self.ws = None
+            logger.info("🔄 [WebSocket] 5秒后重连...")
             await asyncio.sleep(5)
-            await self.connect_websocket()
+
+    def _on_billing(self, data):
+        model = data.get("model", "Unknown")
+        cost_micro = _to_micro(data.get("cost", 0.0))
+        fused = data.get("fused", False)
+        currency = data.get("currency")
+        
+        # 更新币种符号
+        if currency is not None:
+            self.currency = currency
+            self.currency_symbol = "$" if currency == "USD" else "￥"
+            logger.debug("🌍 [WebSocket] 币种更新为: %s (%s)", self.currency, self.currency_symbol)
+        
+        # 🆕 [铁血熔断] 检查是否是熔断信号
+        if fused:
+            logger.debug("🚨 [WebSocket] 收到熔断信号！准备传递给UI")
+            self.billing_dict_signal.emit(data, cost_micro)
+        else:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("💰 [WebSocket] 收到计费: %s = %s%.6f", model, self.currency_symbol, cost_micro / 1_000_000)
+            self.billing_signal.emit(model, cost_micro)
+
+    def _on_error(self, data):
+        # 🆕 [熔断错误] 处理错误信号
+        reason = data.get("reason", "unknown")
+        if reason == "budget_exceeded":
+            logger.debug("🚨 [WebSocket] 收到预算超支错误信号！")
+            self.billing_dict_signal.emit({"fused": True, "reason": reason}, _to_micro(data.get("cost", 0.0)))
 
     def start_websocket_thread(self):
         if self.ws_thread is None or not self.ws_thread.is_alive():
@@ -168,13 +319,44 @@ class DynamicIsland(QWidget):
     def _run_websocket(self):
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
+        self.loop = loop
         try:
+            self._http = loop.run_until_complete(self._create_http())
             loop.run_until_complete(self.connect_websocket())
         except Exception as e:
             print(f"❌ [WebSocket] 线程异常: {e}")
         finally:
+            self.loop = None
+            if self._http is not None and not self._http.closed:
+                loop.run_until_complete(self._http.close())
+            self._http = None
             loop.close()
 
+    async def _create_http(self):
+        # 所有控制面 POST 共用一个 keep-alive 连接池
+        return aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=4, force_close=False))
+
+    def _close_http(self):
+        # 运行于 GUI 线程（aboutToQuit）：同步等待关闭完成，否则守护线程会在关闭前被结束
+        loop, http = self.loop, self._http
+        if loop is None or http is None or http.closed:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(http.close(), loop).result(timeout=1)
+        except Exception as e:
+            print(f"❌ [HTTP] 关闭连接池失败: {e}")
+
+    async def _post_json(self, url, payload):
+        async with self._http.post(url, json=payload, timeout=aiohttp.ClientTimeout(total=5)) as response:
+            return response.status
+
+    def _submit_post(self, url, payload, callback):
+        # 🚀 [非阻塞] 将 HTTP 请求调度到 WebSocket 事件循环，结果通过回调在事件循环线程中返回
+        if self.loop is None or self.loop.is_closed() or self._http is None:
+            raise RuntimeError("WebSocket 事件循环未运行")
+        future = asyncio.run_coroutine_threadsafe(self._post_json(url, payload), self.loop)
+        future.add_done_callback(callback)
+
     def on_tray_activated(self, reason):
         if reason == QSystemTrayIcon.Trigger:
             if self.isVisible():
@@ -230,22 +412,16 @@ class DynamicIsland(QWidget):
         self.shrink_anim.setEndValue(QRect(center_x - new_width // 2, center_y - new_height // 2, new_width, new_height))
         self.shrink_anim.start()
 
+    def initContextMenu(self):
+        # 右键菜单只构建一次，之后每次右键直接复用
+        self._ctx_menu = QMenu(self)
+        self._ctx_menu.addAction("设置熔断限额", self.show_limit_dialog)
+        self._ctx_menu.addAction("📚 历史对话", self.show_history_info)
+        self._ctx_menu.addAction("💰 重置费用", self.reset_cost)
+        self._ctx_menu.addAction("退出哨兵", QApplication.instance().quit)
+
     def contextMenuEvent(self, event):
-        menu = QMenu(self)
-        
-        set_limit_action = menu.addAction("设置熔断限额")
-        set_limit_action.triggered.connect(self.show_limit_dialog)
-        
-        history_chat_action = menu.addAction("📚 历史对话")
-        history_chat_action.triggered.connect(self.show_history_info)
-        
-        reset_cost_action = menu.addAction("💰 重置费用")
-        reset_cost_action.triggered.connect(self.reset_cost)
-        
-        quit_action = menu.addAction("退出哨兵")
-        quit_action.triggered.connect(QApplication.instance().quit)
-        
-        menu.exec_(event.globalPos())
+        self._ctx_menu.exec_(event.globalPos())
 
     def show_limit_dialog(self):
         currency_name = "美元" if self.currency == "USD" else "人民币"
@@ -260,20 +436,27 @@ class DynamicIsland(QWidget):
         )
         
         if ok:
+            print(f"🔄 [UI] 用户更新限额: {self.currency_symbol}{amount}")
+            
+            def on_done(future):
+                # 运行于事件循环线程，通过 billing_signal（队列连接）回到 UI 线程
+                try:
+                    status = future.result()
+                except Exception as e:
+                    print(f"❌ [UI] 限额更新异常: {e}")
+                    return
+                if status == 200:
+                    print(f"✅ [UI] 限额更新成功: {self.currency_symbol}{amount}")
+                    self.billing_signal.emit("限额已更新", _to_micro(amount))
+                else:
+                    print(f"❌ [UI] 限额更新失败: {status}")
+            
             try:
-                print(f"🔄 [UI] 用户更新限额: {self.currency_symbol}{amount}")
-                
-                response = requests.post(
+                self._submit_post(
                     "http://127.0.0.1:3001/v1/config/limit",
-                    json={"limit": amount},
-                    timeout=5
+                    {"limit": amount},
+                    on_done
                 )
-                
-                if response.status_code == 200:
-                    print(f"✅ [UI] 限额更新成功: {self.currency_symbol}{amount}")
-                    self.show_billing("限额已更新", amount)
-                else:
-                    print(f"❌ [UI] 限额更新失败: {response.status_code}")
             except Exception as e:
                 print(f"❌ [UI] 限额更新异常: {e}")
     
@@ -285,40 +468,51 @@ class DynamicIsland(QWidget):
         self.show()
         self.setWindowOpacity(1.0)
         self.label_model.setText("🧹 新对话")
-        self.label_model.setStyleSheet("color: #52C41A; font-weight: bold;")
-        self.label_cost.setText(f"ID: {new_session_id[-8:]}")
-        self.label_cost.setStyleSheet("color: #52C41A; font-family: 'Consolas'; font-size: 14pt; font-weight: bold;")
-        self.container.setStyleSheet(""" 
-            #IslandContainer { 
-                background-color: rgba(82, 196, 26, 0.95); 
-                border: 2px solid rgba(255, 255, 255, 0.5); 
-                border-radius: 25px; 
-            } 
-        """)
+        self.label_model.setStyleSheet(LABEL_GREEN_NEW_CHAT)
+        self.label_cost.setText(self._fmt_session_id(new_session_id))
+        self._apply_theme(STYLE_GREEN_NEW_CHAT, LABEL_GREEN_NEW_CHAT_MONO)
         
         # 3秒后恢复默认样式
         QTimer.singleShot(3000, self.reset_style)
+        
+        # 💡 [新对话] 提示用户
+        print(f"💡 [UI] 新对话已创建，下次请求将使用新 session_id: {new_session_id}")
+        print(f"💰 [UI] 提示：新对话不会继承历史记录，可以节省 Token 成本！")
     
     def reset_cost(self):
         print(f"💰 [UI] 重置累计费用")
         
+        def on_done(future):
+            # 运行于事件循环线程，通过 reset_signal（队列连接）回到 UI 线程
+            try:
+                status = future.result()
+            except Exception as e:
+                print(f"❌ [UI] 费用重置异常: {e}")
+                self.reset_signal.emit(False, str(e))
+                return
+            if status == 200:
+                print(f"✅ [UI] 费用重置成功")
+                self.reset_signal.emit(True, "")
+            else:
+                print(f"❌ [UI] 费用重置失败: {status}")
+                self.reset_signal.emit(False, "无法重置累计费用")
+        
         try:
-            response = requests.post(
+            self._submit_post(
                 "http://127.0.0.1:3001/v1/config/reset_cost",
-                json={},
-                timeout=5
+                {},
+                on_done
             )
-            
-            if response.status_code == 200:
-                print(f"✅ [UI] 费用重置成功")
-                self.show_reset_success()
-            else:
-                print(f"❌ [UI] 费用重置失败: {response.status_code}")
-                self.show_error_message("重置失败", "无法重置累计费用")
         except Exception as e:
             print(f"❌ [UI] 费用重置异常: {e}")
             self.show_error_message("重置失败", str(e))
     
+    def _on_reset_result(self, success, message):
+        if success:
+            self.show_reset_success()
+        else:
+            self.show_error_message("重置失败", message)
+    
     def show_reset_success(self):
         print(f"✅ [UI] 显示重置成功提示")
         
@@ -326,70 +520,57 @@ class DynamicIsland(QWidget):
         self.show()
         self.setWindowOpacity(1.0)
         self.label_model.setText("💰 费用已重置")
-        self.label_model.setStyleSheet("color: #4CAF50; font-weight: bold;")
+        self.label_model.setStyleSheet(LABEL_GREEN_RESET)
         self.label_cost.setText("从 0 开始")
-        self.label_cost.setStyleSheet("color: #4CAF50; font-family: 'Consolas'; font-size: 14pt; font-weight: bold;")
-        self.container.setStyleSheet(""" 
-            #IslandContainer { 
-                background-color: rgba(76, 175, 80, 0.95); 
-                border: 2px solid rgba(255, 255, 255, 0.5); 
-                border-radius: 25px; 
-            } 
-        """)
+        self._apply_theme(STYLE_GREEN_RESET, LABEL_GREEN_RESET_MONO)
         
         # 3秒后恢复默认样式
         QTimer.singleShot(3000, self.reset_style)
         
         # 💡 [重置成功] 提示用户
         print(f"💡 [UI] 提示：累计费用已重置为 0，可以重新开始计费！")
-        
-        # 💡 [新对话] 提示用户
-        print(f"💡 [UI] 新对话已创建，下次请求将使用新 session_id: {new_session_id}")
-        print(f"💰 [UI] 提示：新对话不会继承历史记录，可以节省 Token 成本！")
     
     def show_history_info(self):
         print(f"📚 [UI] 显示历史对话信息")
         
-        # 🆕 [历史对话] 从 Redis DB1 获取所有历史对话
+        # 🆕 [历史对话] 在线程池中 SCAN Redis DB1，避免阻塞 UI 线程
+        QThreadPool.globalInstance().start(_Task(self._scan_history))
+    
+    def _scan_history(self):
+        # 运行于线程池线程，结果通过信号（队列连接）回到 UI 线程
         try:
-            import subprocess
-            result = subprocess.run(
-                [".\\Redis\\redis-cli.exe", "-p", "6379", "-n", "1", "KEYS", "sentinel:chat:*"],
-                capture_output=True,
-                text=True,
-                cwd="d:\\Deep-Sentinel"
-            )
-            
-            if result.returncode == 0:
-                keys = result.stdout.strip().split('\n')
-                session_ids = [key.replace('sentinel:chat:', '') for key in keys if key.strip()]
-                
-                if not session_ids:
-                    print(f"⚠️ [UI] 没有找到历史对话")
-                    self.show_no_history_warning()
-                    return
-                
-                print(f"📚 [UI] 找到 {len(session_ids)} 个历史对话")
-                
-                # 显示历史对话列表
-                session_id, ok = QInputDialog.getItem(
-                    self,
-                    "选择历史对话",
-                    "请选择要继续的对话：",
-                    session_ids,
-                    0,  # 默认选择第一个
-                    False  # 不允许编辑
-                )
-                
-                if ok and session_id:
-                    print(f"📚 [UI] 用户选择了历史对话: {session_id}")
-                    self.show_selected_history(session_id)
-            else:
-                print(f"❌ [UI] 获取历史对话失败: {result.stderr}")
-                self.show_error_message("获取历史对话失败", "无法连接到 Redis 数据库")
+            prefix_len = len(HISTORY_KEY_PREFIX)
+            keys = self._redis.scan_iter(f"{HISTORY_KEY_PREFIX}*", count=500)
+            # SCAN 可能重复返回同一个 key（如 rehash 期间），按首次出现顺序去重
+            self.history_signal.emit(list(dict.fromkeys(key[prefix_len:] for key in keys)))
         except Exception as e:
             print(f"❌ [UI] 获取历史对话异常: {e}")
-            self.show_error_message("获取历史对话失败", str(e))
+            self.history_error_signal.emit(str(e))
+    
+    def _on_history_loaded(self, session_ids):
+        if not session_ids:
+            print(f"⚠️ [UI] 没有找到历史对话")
+            self.show_no_history_warning()
+            return
+        
+        print(f"📚 [UI] 找到 {len(session_ids)} 个历史对话")
+        
+        # 显示历史对话列表
+        session_id, ok = QInputDialog.getItem(
+            self,
+            "选择历史对话",
+            "请选择要继续的对话：",
+            session_ids,
+            0,  # 默认选择第一个
+            False  # 不允许编辑
+        )
+        
+        if ok and session_id:
+            print(f"📚 [UI] 用户选择了历史对话: {session_id}")
+            self.show_selected_history(session_id)
+    
+    def _on_history_error(self, message):
+        self.show_error_message("获取历史对话失败", message)
     
     def show_selected_history(self, session_id):
         print(f"📚 [UI] 显示选中的历史对话: {session_id}")
@@ -398,16 +579,9 @@ class DynamicIsland(QWidget):
         self.show()
         self.setWindowOpacity(1.0)
         self.label_model.setText("📚 历史对话")
-        self.label_model.setStyleSheet("color: #2196F3; font-weight: bold;")
-        self.label_cost.setText(f"ID: {session_id[-8:]}")
-        self.label_cost.setStyleSheet("color: #2196F3; font-family: 'Consolas'; font-size: 14pt; font-weight: bold;")
-        self.container.setStyleSheet(""" 
-            #IslandContainer { 
-                background-color: rgba(33, 150, 243, 0.95); 
-                border: 2px solid rgba(255, 255, 255, 0.5); 
-                border-radius: 25px; 
-            } 
-        """)
+        self.label_model.setStyleSheet(LABEL_BLUE_HISTORY)
+        self.label_cost.setText(self._fmt_session_id(session_id))
+        self._apply_theme(STYLE_BLUE_HISTORY, LABEL_BLUE_HISTORY_MONO)
         
         # 3秒后恢复默认样式
         QTimer.singleShot(3000, self.reset_style)
@@ -423,16 +597,9 @@ class DynamicIsland(QWidget):
         self.show()
         self.setWindowOpacity(1.0)
         self.label_model.setText("⚠️ 无历史")
-        self.label_model.setStyleSheet("color: #FFA500; font-weight: bold;")
+        self.label_model.setStyleSheet(LABEL_YELLOW_WARN)
         self.label_cost.setText("暂无记录")
-        self.label_cost.setStyleSheet("color: #FFA500; font-family: 'Consolas'; font-size: 14pt; font-weight: bold;")
-        self.container.setStyleSheet(""" 
-            #IslandContainer { 
-                background-color: rgba(255, 165, 0, 0.95); 
-                border: 2px solid rgba(255, 255, 255, 0.5); 
-                border-radius: 25px; 
-            } 
-        """)
+        self._apply_theme(STYLE_YELLOW_WARN, LABEL_YELLOW_WARN_MONO)
         
         # 3秒后恢复默认样式
         QTimer.singleShot(3000, self.reset_style)
@@ -447,30 +614,17 @@ class DynamicIsland(QWidget):
         self.show()
         self.setWindowOpacity(1.0)
         self.label_model.setText("❌ 错误")
-        self.label_model.setStyleSheet("color: #F44336; font-weight: bold;")
+        self.label_model.setStyleSheet(LABEL_ERROR)
         self.label_cost.setText(message)
-        self.label_cost.setStyleSheet("color: #F44336; font-family: 'Consolas'; font-size: 12pt; font-weight: bold;")
-        self.container.setStyleSheet(""" 
-            #IslandContainer { 
-                background-color: rgba(244, 67, 54, 0.95); 
-                border: 2px solid rgba(255, 255, 255, 0.5); 
-                border-radius: 25px; 
-            } 
-        """)
+        self._apply_theme(STYLE_ERROR, LABEL_ERROR_MONO)
         
         # 3秒后恢复默认样式
         QTimer.singleShot(3000, self.reset_style)
     
     def reset_style(self):
-        self.container.setStyleSheet(""" 
-            #IslandContainer { 
-                background-color: rgba(255, 255, 255, 0.9); 
-                border: 2px solid rgba(255, 255, 255, 0.5); 
-                border-radius: 25px; 
-            } 
-        """)
-        self.label_model.setStyleSheet("color: #333; font-weight: bold;")
-        self.label_cost.setStyleSheet("color: #333; font-family: 'Consolas'; font-size: 14pt; font-weight: bold;")
+        self._apply_theme(STYLE_LIGHT, LABEL_DARK_MONO)
+        self.label_model.setStyleSheet(LABEL_DARK_BOLD)
+
 
     def mousePressEvent(self, event):
         self.oldPos = event.globalPos()
@@ -480,99 +634,72 @@ class DynamicIsland(QWidget):
         self.move(self.x() + delta.x(), self.y() + delta.y())
         self.oldPos = event.globalPos()
 
-    def show_billing(self, model, price):
-        print(f"🎬 [UI] show_billing 被调用: 模型={model}, 价格={self.currency_symbol}{price}")
+    def show_fused(self, data, price_micro):
+        # 🆕 [铁血熔断] 处理熔断信号（包含fused字段或reason字段）
+        if not (data.get("fused", False) or data.get("reason") == "budget_exceeded"):
+            return
+        logger.debug("🚨 [UI] 收到熔断信号！")
+        # 熔断优先：丢弃尚未刷新的计费，避免覆盖熔断提示
+        self._pending_billing = None
+        self._repaint_timer.stop()
+        self.show()
+        self.setWindowOpacity(1.0)
         
-        # 🆕 [铁血熔断] 检查是否是熔断信号
-        if isinstance(model, dict):
-            # 处理熔断信号（包含fused字段或reason字段）
-            if model.get("fused", False) or model.get("reason") == "budget_exceeded":
-                print(f"🚨 [UI] 收到熔断信号！")
-                self.show()
-                self.setWindowOpacity(1.0)
-                
-                self.label_model.setText("🚨 熔断拦截")
-                self.label_model.setStyleSheet("color: #FF4D4F; font-weight: bold;")
-                
-                self.label_cost.setText(f"{self.currency_symbol}{price:.4f}")
-                self.label_cost.setStyleSheet("color: #FF4D4F; font-family: 'Consolas'; font-size: 14pt; font-weight: bold;")
-                
-                self.container.setStyleSheet(""" 
-                    #IslandContainer { 
-                        background-color: rgba(255, 77, 79, 0.95); 
-                        border: 2px solid rgba(255, 255, 255, 0.5); 
-                        border-radius: 25px; 
-                    } 
-                """)
+        self.label_model.setText("🚨 熔断拦截")
+        self.label_model.setStyleSheet(LABEL_FUSED_BOLD)
+        
+        self.label_cost.setText(self._fmt_price(self.currency_symbol, price_micro, 4))
+        self._apply_theme(STYLE_FUSED, LABEL_FUSED_MONO)
+    
+    def show_billing(self, model, price_micro):
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("🎬 [UI] show_billing 被调用: 模型=%s, 价格=%s%.6f", model, self.currency_symbol, price_micro / 1_000_000)
+        
+        # ✅ 过滤无效计费：只有价格大于 0.000001（1 微单位）才显示
+        if price_micro <= 1:
+            logger.debug("🚫 [Island] 收到无效计费 %s%.6f，已忽略", self.currency_symbol, price_micro / 1_000_000)
             return
         
-        # ✅ 过滤无效计费：只有价格大于 0.000001 才显示
-        if price <= 0.000001:
-            print(f"🚫 [Island] 收到无效计费 {self.currency_symbol}{price:.8f}，已忽略")
+        # 🚀 [合并刷新] 只记录最新计费，由定时器统一刷新
+        self._pending_billing = (model, price_micro)
+        if not self._repaint_timer.isActive():
+            self._repaint_timer.start()
+    
+    def _flush_billing(self):
+        if self._pending_billing is None:
             return
+        model, price_micro = self._pending_billing
+        self._pending_billing = None
         
-        # 🚀 [绝对实时] 直接更新显示，不使用队列和动画
         self.show()
         self.setWindowOpacity(1.0)
         
         self.label_model.setText(model)
-        self.label_model.setStyleSheet("color: #888; font-weight: bold;")
+        self.label_model.setStyleSheet(LABEL_GREY_BOLD)
         
         # 根据金额大小决定显示精度
-        precision = 6 if price < 0.01 else 4
-        self.label_cost.setText(f"{self.currency_symbol}{price:.{precision}f}")
-        
-        if price > 0.008:
-            self.container.setStyleSheet(""" 
-                #IslandContainer { 
-                    background-color: rgba(255, 68, 68, 0.95); 
-                    border: 1px solid rgba(255, 255, 255, 0.3); 
-                    border-radius: 25px; 
-                } 
-            """)
-            self.label_cost.setStyleSheet("color: #FFFFFF; font-family: 'Consolas'; font-size: 14pt; font-weight: bold;")
-        elif price > 0.005:
-            self.container.setStyleSheet(""" 
-                #IslandContainer { 
-                    background-color: rgba(255, 136, 0, 0.95); 
-                    border: 1px solid rgba(255, 255, 255, 0.3); 
-                    border-radius: 25px; 
-                } 
-            """)
-            self.label_cost.setStyleSheet("color: #FFFFFF; font-family: 'Consolas'; font-size: 14pt; font-weight: bold;")
+        precision = 6 if price_micro < 10_000 else 4
+        self.label_cost.setText(self._fmt_price(self.currency_symbol, price_micro, precision))
+        
+        if price_micro > 8_000:
+            self._apply_theme(STYLE_RED, LABEL_WHITE_MONO)
+        elif price_micro > 5_000:
+            self._apply_theme(STYLE_ORANGE, LABEL_WHITE_MONO)
         else:
-            self.container.setStyleSheet(""" 
-                #IslandContainer { 
-                    background-color: rgba(15, 15, 20, 0.95); 
-                    border: 1px solid rgba(255, 255, 255, 0.2); 
-                    border-radius: 25px; 
-                } 
-            """)
-            self.label_cost.setStyleSheet("color: #00FF7F; font-family: 'Consolas'; font-size: 14pt; font-weight: bold;")
+            self._apply_theme(STYLE_DARK, LABEL_GREEN_MONO)
 
     def _reset_style(self):
         print(f"🔄 [UI] 重置样式")
-        self.setStyleSheet(""" 
-            #IslandContainer { 
-                background-color: qlineargradient(x1:0, y1:0, x2:1, y2:1, 
-                                    stop:0 rgba(20, 20, 25, 240), 
-                                    stop:1 rgba(10, 10, 15, 250)); 
-                border: 1px solid rgba(255,255, 255, 0.1); 
-                border-radius: 25px; 
-            } 
-            QLabel { 
-                background: transparent; 
-            } 
-        """)
-
-    def _display_billing(self, model, price):
-        print(f"🎬 [UI] 开始显示: 模型={model}, 价格={self.currency_symbol}{price}")
+        self.setStyleSheet(STYLE_GRADIENT)
+
+    def _display_billing(self, model, price_micro):
+        print(f"🎬 [UI] 开始显示: 模型={model}, 价格={self.currency_symbol}{price_micro / 1_000_000}")
         self.label_model.setText(model)
-        self.label_model.setStyleSheet("color: #FFFFFF; font-weight: bold;")
+        self.label_model.setStyleSheet(LABEL_WHITE_BOLD)
         
         # 根据金额大小决定显示精度
-        precision = 6 if price < 0.01 else 4
-        self.label_cost.setText(f"{self.currency_symbol}{price:.{precision}f}")
+        precision = 6 if price_micro < 10_000 else 4
+        self.label_cost.setText(self._fmt_price(self.currency_symbol, price_micro, precision))
         print(f"🎬 [UI] 标签已更新，开始动画...")
 
         if self.anim and self.anim.state() == QPropertyAnimation.Running:
@@ -595,25 +722,39 @@ class DynamicIsland(QWidget):
         # 常驻模式：不自动收缩，保持窗口一直显示
 
         if self.billing_queue:
-            next_model, next_price = self.billing_queue.popleft()
-            print(f"📋 [队列] 从队列取出下一个: {next_model}")
-            print(f"📋 [队列] 剩余队列长度: {len(self.billing_queue)}")
-            QTimer.singleShot(100, lambda: self._display_billing(next_model, next_price))
-        else:
+            # 由常驻定时器按 ~30Hz 逐条取出，避免每条都创建 lambda 闭包
+            if not self._queue_timer.isActive():
+                self._queue_timer.start()
+        elif not self._queue_timer.isActive():
+            print(f"📋 [队列] 队列为空，解除忙碌状态")
+            self.is_busy = False
+
+    def _drain_queue(self):
+        if not self.billing_queue:
             print(f"📋 [队列] 队列为空，解除忙碌状态")
+            self._queue_timer.stop()
             self.is_busy = False
+            return
+        next_model, next_price = self.billing_queue.popleft()
+        print(f"📋 [队列] 从队列取出下一个: {next_model}")
+        print(f"📋 [队列] 剩余队列长度: {len(self.billing_queue)}")
+        self._display_billing(next_model, next_price)
 
 def start_websocket_thread(window):
     print(f"🚀 [DEBUG] 启动 WebSocket 线程...")
     window.start_websocket_thread()
 
+# 单例锁：保存在模块全局，解释器退出时自动释放
+_instance_lock = filelock.FileLock(os.path.join(tempfile.gettempdir(), "deepsentinel.lock"))
+
 def check_single_instance():
     try:
-        mutex = ctypes.windll.kernel32.CreateMutexW(None, False, "DeepSentinel_SingleInstance_Mutex")
-        if ctypes.windll.kernel32.GetLastError() == 183:
-            return False
+        _instance_lock.acquire(timeout=0)
         return True
-    except:
+    except filelock.Timeout:
+        return False
+    except OSError:
+        # 锁文件不可用（如其他用户创建、无权限）时放行，与原先行为一致
         return True
 
 if __name__ == '__main__':
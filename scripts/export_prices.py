@@ -1,42 +1,56 @@
 import redis
-import json
+import orjson
+from collections import defaultdict
+from operator import itemgetter
 from datetime import datetime
 
 def export_redis_prices():
-    r = redis.Redis(host='127.0.0.1', port=6379, decode_responses=True)
+    pool = redis.ConnectionPool(host='127.0.0.1', port=6379, decode_responses=True, max_connections=4)
+    r = redis.Redis(connection_pool=pool)
     
-    keys = r.keys('price:*')
+    keys = list(r.scan_iter('price:*', count=500))
     
     prices = {}
     
+    # 非事务 pipeline 批量 GET：一次往返，且不会像单条大 MGET 那样长时间占用 Redis
+    pipe = r.pipeline(transaction=False)
     for key in keys:
+        pipe.get(key)
+    # 单个 key 出错（如 WRONGTYPE）时不中断整个导出，错误按 key 返回
+    values = pipe.execute(raise_on_error=False)
+    
+    for key, data in zip(keys, values):
+        if isinstance(data, redis.ResponseError):
+            print(f"Error reading {key}: {data}")
+            continue
         try:
-            data = r.get(key)
             if data:
-                prices[key] = json.loads(data)
+                prices[key] = orjson.loads(data)
         except Exception as e:
             print(f"Error reading {key}: {e}")
     
     output_file = 'prices_export.json'
     
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(prices, f, ensure_ascii=False, indent=2)
+    # orjson 直接输出 UTF-8 字节，一次写入
+    with open(output_file, 'wb') as f:
+        f.write(orjson.dumps(prices, option=orjson.OPT_INDENT_2))
     
     print(f"✅ 已导出 {len(prices)} 个模型价格到 {output_file}")
     
     # 按 vendor 分类统计
-    vendor_stats = {}
+    vendor_stats = defaultdict(list)
     for key, price_data in prices.items():
-        vendor = price_data.get('vendor', 'unknown')
-        if vendor not in vendor_stats:
-            vendor_stats[vendor] = []
-        model_id = key.replace('price:', '')
-        vendor_stats[vendor].append({
-            'model': model_id,
-            'input_price': price_data.get('input_price', 0),
-            'output_price': price_data.get('output_price', 0)
+        get = price_data.get
+        vendor_stats[get('vendor', 'unknown')].append({
+            'model': key[6:],  # 去掉 'price:' 前缀
+            'input_price': get('input_price', 0),
+            'output_price': get('output_price', 0)
         })
     
+    # 各 vendor 分组一次性原地排序，打印时无需再排序
+    for models in vendor_stats.values():
+        models.sort(key=itemgetter('model'))
+    
     print(f"\n📊 价格统计（按 vendor 分类）：")
     print("=" * 80)
     
@@ -46,7 +60,7 @@ def export_redis_prices():
         print(f"   {'模型':<30} {'输入价格':<15} {'输出价格':<15}")
         print(f"   {'-'*30} {'-'*15} {'-'*15}")
         
-        for model_info in sorted(models, key=lambda x: x['model']):
+        for model_info in models:
             model = model_info['model']
             input_price = model_info['input_price']
             output_price = model_info['output_price']
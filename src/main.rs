@@ -677,7 +677,12 @@ async fn handle_socket(mut socket: WebSocket, state: Arc<AppState>) {
         tokio::select! {
             msg = rx.recv() => {
                 if let Ok(msg) = msg {
-                    if socket.send(Message::Text(msg.to_string())).await.is_err() {
+                    // 🚀 [二进制帧] 计费消息以 msgpack 发送，编码失败时回退为 JSON 文本帧
+                    let frame = match rmp_serde::to_vec_named(&msg) {
+                        Ok(bytes) => Message::Binary(bytes),
+                        Err(_) => Message::Text(msg.to_string()),
+                    };
+                    if socket.send(frame).await.is_err() {
                         break;
                     }
                 }